@@ -1,8 +1,39 @@
 from croniter import croniter
-from django.contrib.admin import register, ModelAdmin
+from django.contrib.admin import register, ModelAdmin, TabularInline
 from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
 from django.forms import ModelForm
-from jobsy.models import Job, JobInstance
+from django.utils.functional import cached_property
+from jobsy.models import Calendar, CalendarExclusion, Job, JobInstance
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator which uses the PostgreSQL planner's row estimate for unfiltered querysets over
+    large tables, instead of running a full COUNT(*) on every page load.
+    """
+    estimate_threshold = 10000  # Below this estimate, an exact count is cheap enough.
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = self.get_estimate()
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+        return super().count
+
+    def get_estimate(self):
+        """Returns the planner's estimated row count for the queryset's table (PostgreSQL only),
+        or None.
+        """
+        qs = self.object_list
+        connection = connections[qs.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", [qs.model._meta.db_table])
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
 
 
 class JobAdminForm(ModelForm):
@@ -25,6 +56,7 @@ class JobAdmin(ModelAdmin):
         "owner",
         "active",
         "url",
+        "calendar",
         "last_checked",
         "last_good",
         "last_notify",
@@ -43,7 +75,9 @@ class JobAdmin(ModelAdmin):
         "last_notify",
         "workflow_check_result",
     )
-    list_filter = ("active",)
+    list_filter = ("active", "calendar")
+    list_select_related = ("owner",)
+    paginator = EstimatedCountPaginator
     readonly_fields = (
         "id",
         "created",
@@ -52,8 +86,44 @@ class JobAdmin(ModelAdmin):
         "last_notify",
         "workflow_check_result",
     )
-    search_fields = ("name", "status", "owner")
+    # Owner email is matched exactly (case-insensitive), using the UPPER(email) index.
+    search_fields = ("name", "status", "=owner__email")
+    show_full_result_count = False
 
     def schedule_desc(self, obj):
         return obj.get_schedule_desc()
     schedule_desc.short_description = 'schedule'
+
+
+@register(JobInstance)
+class JobInstanceAdmin(ModelAdmin):
+    """Read-only admin for job instances, which may number in the millions. The ordering is
+    served by the (created, id) index, but pages are still fetched using OFFSET.
+    """
+    fields = ("id", "created", "job", "status")
+    list_display = ("created", "job", "status")
+    list_select_related = ("job", "job__owner")
+    paginator = EstimatedCountPaginator
+    readonly_fields = fields
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class CalendarExclusionInline(TabularInline):
+    model = CalendarExclusion
+    extra = 1
+
+
+@register(Calendar)
+class CalendarAdmin(ModelAdmin):
+    inlines = (CalendarExclusionInline,)
+    list_display = ("name", "description")
+    search_fields = ("name",)
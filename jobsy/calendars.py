@@ -0,0 +1,87 @@
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from time import monotonic
+
+
+# Compiled calendars are reloaded after this many seconds, so that changes made in another
+# process (e.g. via the admin) are picked up by long-running processes.
+CACHE_TIMEOUT = 300
+
+_cache = {
+    "calendars": None,
+    "loaded": 0,
+}
+
+
+class CompiledCalendar:
+    """An in-memory index of the exclusions for a Calendar. Whole excluded days are stored as
+    one integer bitmap per year (bit N set for day-of-year N + 1), and partial-day windows are
+    stored as lists of (start, end) times per date, so that testing whether a timestamp is
+    excluded is O(1).
+    """
+
+    def __init__(self):
+        self.days = {}
+        self.windows = {}
+
+    def add(self, day, start_time=None, end_time=None):
+        if start_time is None and end_time is None:
+            bit = 1 << (day.timetuple().tm_yday - 1)
+            self.days[day.year] = self.days.get(day.year, 0) | bit
+        else:
+            self.windows.setdefault(day, []).append((start_time or time.min, end_time or time.max))
+
+    def is_excluded(self, dt):
+        """Returns True if the passed-in datetime falls on an excluded day or within an excluded
+        time window (local time).
+        """
+        return self.get_exclusion(dt) is not None
+
+    def get_exclusion(self, dt):
+        """Returns a (start, end) tuple of timezone-aware datetimes for the excluded day or time
+        window containing the passed-in datetime, or None if it isn't excluded.
+        """
+        tz = timezone.get_default_timezone()
+        if timezone.is_aware(dt):
+            dt = dt.astimezone(tz)
+        day = dt.date()
+        midnight = timezone.make_aware(datetime.combine(day, time.min), tz)
+        if self.days.get(day.year, 0) >> (day.timetuple().tm_yday - 1) & 1:
+            return midnight, midnight + timedelta(days=1)
+        t = dt.time()
+        for start, end in self.windows.get(day, ()):
+            if start <= t < end:
+                start = timezone.make_aware(datetime.combine(day, start), tz)
+                if end == time.max:
+                    end = midnight + timedelta(days=1)
+                else:
+                    end = timezone.make_aware(datetime.combine(day, end), tz)
+                return start, end
+        return None
+
+
+def load_calendars():
+    """Compile every calendar and its exclusions, using a single query.
+    """
+    from jobsy.models import CalendarExclusion
+
+    calendars = {}
+    for exclusion in CalendarExclusion.objects.order_by():
+        calendars.setdefault(exclusion.calendar_id, CompiledCalendar()).add(exclusion.date, exclusion.start_time, exclusion.end_time)
+    return calendars
+
+
+def get_compiled_calendar(calendar_id):
+    """Returns the CompiledCalendar for the passed-in Calendar id (an empty calendar if it has no
+    exclusions). All calendars are compiled together and cached in memory.
+    """
+    if _cache["calendars"] is None or monotonic() - _cache["loaded"] > CACHE_TIMEOUT:
+        _cache["calendars"] = load_calendars()
+        _cache["loaded"] = monotonic()
+    return _cache["calendars"].get(calendar_id) or CompiledCalendar()
+
+
+def clear_calendar_cache(*args, **kwargs):
+    """Discard all compiled calendars (usable as a signal receiver).
+    """
+    _cache["calendars"] = None
@@ -0,0 +1,179 @@
+"""Optional write-behind ingestion of job instances.
+
+When settings.INGEST_SPOOL_DIR is set, JobDetailView.post appends each new instance to an
+append-only spool file (one per worker process) instead of inserting it directly. The
+flush_ingest_spool management command periodically rotates the spool files into segments and
+loads each segment into JobInstance in a single transaction, using COPY on PostgreSQL. Each
+committed segment is recorded in the IngestSegment ledger within that transaction, so a
+segment left behind by a crash is replayed only if it was never committed.
+"""
+from datetime import datetime
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from jobsy.models import IngestSegment, Job, JobInstance
+from pathlib import Path
+from time import time_ns
+import csv
+import fcntl
+import io
+import json
+import logging
+import os
+import socket
+import uuid
+
+
+SPOOL_SUFFIX = ".spool"
+SEGMENT_SUFFIX = ".flushing"
+LOCK_FILE = "flush.lock"
+
+
+def spool_enabled():
+    return bool(settings.INGEST_SPOOL_DIR)
+
+
+def spool_size(spool_dir):
+    """Returns the total size in bytes of all unflushed spool files and segments.
+    """
+    size = 0
+    with os.scandir(spool_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith((SPOOL_SUFFIX, SEGMENT_SUFFIX)):
+                try:
+                    size += entry.stat().st_size
+                except FileNotFoundError:  # Flushed in the meantime.
+                    pass
+    return size
+
+
+def spool_instance(job_id, status, created=None):
+    """Append a job instance record to this process's spool file. Returns False without writing
+    if the spool has reached settings.INGEST_SPOOL_MAX_BYTES, in which case the caller should
+    insert the instance directly.
+    """
+    spool_dir = Path(settings.INGEST_SPOOL_DIR)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    if spool_size(spool_dir) >= settings.INGEST_SPOOL_MAX_BYTES:
+        return False
+    if not created:
+        created = timezone.now()
+    line = json.dumps({"job": str(job_id), "created": created.isoformat(), "status": status}) + "\n"
+    path = spool_dir / f"{os.getpid()}{SPOOL_SUFFIX}"
+
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # If the file was rotated while we waited for the lock, reopen it.
+            try:
+                rotated = os.fstat(fd).st_ino != os.stat(path).st_ino
+            except FileNotFoundError:
+                rotated = True
+            if rotated:
+                continue
+            os.write(fd, line.encode())
+            if settings.INGEST_SPOOL_FSYNC:
+                os.fsync(fd)
+            return True
+        finally:
+            os.close(fd)  # Also releases the lock.
+
+
+def rotate_spool(spool_dir):
+    """Rename every spool file to a segment file, so that writers start new spool files.
+    """
+    for path in spool_dir.glob(f"*{SPOOL_SUFFIX}"):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            continue
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # Segment names must be unique across hosts, as they are recorded in the database.
+            os.rename(path, path.with_name(f"{socket.gethostname()}.{path.stem}.{time_ns()}{SEGMENT_SUFFIX}"))
+        finally:
+            os.close(fd)
+
+
+def read_segment(path):
+    """Generator yielding (job_id, created, status) tuples from a segment file. Malformed lines
+    (e.g. a partial write interrupted by a crash) are logged and skipped.
+    """
+    logger = logging.getLogger("jobsy")
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                yield uuid.UUID(record["job"]), datetime.fromisoformat(record["created"]), record["status"]
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f"Skipping malformed ingest record in {path.name}: {line!r}")
+
+
+def insert_batch(batch):
+    """Insert a batch of (job_id, created, status) tuples into JobInstance, using COPY on
+    PostgreSQL. Records for jobs which no longer exist are discarded.
+    """
+    job_ids = set(Job.objects.filter(id__in={r[0] for r in batch}).values_list("id", flat=True))
+    batch = [r for r in batch if r[0] in job_ids]
+    if not batch:
+        return 0
+    if connection.vendor == "postgresql":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for job_id, created, status in batch:
+            writer.writerow([job_id, created.isoformat(), status])
+        buf.seek(0)
+        table = JobInstance._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table} (job_id, created, status) FROM STDIN WITH (FORMAT csv)", buf)
+    else:
+        JobInstance.objects.bulk_create(
+            [JobInstance(job_id=job_id, created=created, status=status) for job_id, created, status in batch],
+            batch_size=1000,
+        )
+    return len(batch)
+
+
+def flush_segment(path):
+    """Load a segment file into JobInstance in a single transaction, in batches of
+    settings.INGEST_BATCH_SIZE records (so that memory use is bounded), then delete it.
+    Returns the number of instances inserted.
+    """
+    count = 0
+    # If the segment is in the ledger, an earlier flush committed it but was interrupted before
+    # deleting the file.
+    if not IngestSegment.objects.filter(name=path.name).exists():
+        with transaction.atomic():
+            batch = []
+            for record in read_segment(path):
+                batch.append(record)
+                if len(batch) >= settings.INGEST_BATCH_SIZE:
+                    count += insert_batch(batch)
+                    batch = []
+            if batch:
+                count += insert_batch(batch)
+            IngestSegment.objects.create(name=path.name, count=count)
+    path.unlink()
+    IngestSegment.objects.filter(name=path.name).delete()
+    return count
+
+
+def flush_spool():
+    """Flush all spooled job instances to the database, including any segments left behind by
+    an earlier (interrupted) flush. An exclusive lock on the spool directory prevents concurrent
+    flushes. Returns the number of instances inserted.
+    """
+    spool_dir = Path(settings.INGEST_SPOOL_DIR)
+    if not spool_dir.exists():
+        return 0
+    count = 0
+    fd = os.open(spool_dir / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o640)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        rotate_spool(spool_dir)
+        for path in sorted(spool_dir.glob(f"*{SEGMENT_SUFFIX}")):
+            count += flush_segment(path)
+    finally:
+        os.close(fd)  # Also releases the lock.
+    return count
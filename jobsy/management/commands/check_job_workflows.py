@@ -1,6 +1,12 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
 from django.core.management.base import BaseCommand
-from jobsy.models import Job
+from django.utils import timezone
+from jobsy.ingest import flush_spool, spool_enabled
+from jobsy.models import Job, JobCheck, JobDailySummary, SUMMARY_CACHE_KEY
 import logging
+import time
 
 
 class Command(BaseCommand):
@@ -8,6 +14,45 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         logger = logging.getLogger('jobsy')
-        for job in Job.objects.filter(active=True):
-            logger.info(f"Checking job: {job}")
-            job.notify_workflow()
+        # Flush any spooled (write-behind) instances first, so that they count towards the checks.
+        if spool_enabled():
+            flush_spool()
+        # Check history is buffered and written in a single batch at the end of the run (even if
+        # the run is interrupted).
+        checks = []
+        try:
+            for job in Job.objects.filter(active=True).select_related('owner'):
+                logger.info(f"Checking job: {job}")
+                checked = timezone.now()
+                last_notify = job.last_notify
+                scheduled = None
+                start = time.monotonic()
+                try:
+                    scheduled = job.get_prev()
+                    job.notify_workflow()
+                    result = job.workflow_check_result
+                    notified = job.last_notify != last_notify
+                except Exception:
+                    # Record the failed check (e.g. a calendar excluding every scheduled instance,
+                    # or an error sending a notification) and continue with the other jobs.
+                    logger.exception(f"Unable to check job {job.id}")
+                    result = 'Error'
+                    notified = False
+                checks.append(JobCheck(
+                    job=job,
+                    checked=checked,
+                    result=result,
+                    scheduled=scheduled,
+                    notified=notified,
+                    duration_ms=int((time.monotonic() - start) * 1000),
+                ))
+        finally:
+            JobCheck.objects.bulk_create(checks, batch_size=1000)
+            retention = timezone.now() - timedelta(days=settings.CHECK_HISTORY_RETENTION_DAYS)
+            JobCheck.objects.filter(checked__lt=retention).delete()
+
+            # Refresh the daily summaries for today and yesterday (to include any late instances).
+            today = datetime.now(timezone.get_default_timezone()).date()
+            JobDailySummary.rollup(today - timedelta(days=1))
+            JobDailySummary.rollup(today)
+            cache.delete(SUMMARY_CACHE_KEY)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from jobsy.ingest import flush_spool, spool_enabled
+import logging
+import time
+
+
+class Command(BaseCommand):
+    help = 'Flushes spooled (write-behind) job instances to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', action='store', type=int, default=0, help='Flush repeatedly, waiting this many seconds between flushes')
+
+    def handle(self, *args, **options):
+        if not spool_enabled():
+            raise CommandError('INGEST_SPOOL_DIR is not set')
+        logger = logging.getLogger('jobsy')
+        while True:
+            count = flush_spool()
+            if count:
+                logger.info(f"Flushed {count} spooled job instances")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from jobsy.models import JobDailySummary
+import logging
+
+
+class Command(BaseCommand):
+    help = 'Recalculates daily job summaries for a number of days up to and including today'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', action='store', type=int, default=30, help='Number of days to recalculate (default 30)')
+
+    def handle(self, *args, **options):
+        logger = logging.getLogger('jobsy')
+        today = datetime.now(timezone.get_default_timezone()).date()
+        for i in range(options['days']):
+            day = today - timedelta(days=i)
+            summaries = JobDailySummary.rollup(day)
+            logger.info(f"Recalculated {len(summaries)} job summaries for {day.isoformat()}")
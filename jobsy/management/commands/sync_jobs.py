@@ -0,0 +1,39 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from jobsy.provisioning import sync_jobs
+import json
+
+
+class Command(BaseCommand):
+    help = 'Creates or updates jobs from a JSON manifest file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('manifest', help='Path to a JSON manifest of jobs')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without saving them')
+
+    def handle(self, *args, **options):
+        path = options['manifest']
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except OSError as e:
+            raise CommandError(f'Unable to read manifest: {e}')
+        except ValueError as e:
+            raise CommandError(f'Unable to parse manifest: {e}')
+        if isinstance(manifest, dict):
+            manifest = manifest.get('jobs')
+
+        try:
+            result = sync_jobs(manifest, dry_run=options['dry_run'])
+        except ValidationError as e:
+            raise CommandError('Invalid manifest:\n' + '\n'.join(e.messages))
+
+        for job in result['created']:
+            self.stdout.write(f"+ {job['name']} ({job['owner']})")
+        for job in result['updated']:
+            changes = ', '.join(f"{field}: {old!r} -> {new!r}" for field, (old, new) in job['changes'].items())
+            self.stdout.write(f"~ {job['name']} ({job['id']}): {changes}")
+        summary = f"{len(result['created'])} created, {len(result['updated'])} updated, {result['unchanged']} unchanged"
+        if options['dry_run']:
+            summary = f"Dry run (no changes saved): {summary}"
+        self.stdout.write(summary)
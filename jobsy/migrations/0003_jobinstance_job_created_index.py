@@ -0,0 +1,17 @@
+# Generated by Django 3.2.18 on 2026-10-19 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobsy', '0002_job_url'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobinstance',
+            index=models.Index(fields=['job', '-created', '-id'], name='jobsy_jobinst_job_created'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.18 on 2026-10-19 09:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobsy', '0003_jobinstance_job_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('instance_count', models.PositiveIntegerField(default=0)),
+                ('success_count', models.PositiveIntegerField(default=0)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='jobsy.job')),
+            ],
+            options={
+                'verbose_name_plural': 'job daily summaries',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='jobdailysummary',
+            constraint=models.UniqueConstraint(fields=('job', 'date'), name='jobsy_jobdailysummary_job_date'),
+        ),
+    ]
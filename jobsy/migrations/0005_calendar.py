@@ -0,0 +1,44 @@
+# Generated by Django 3.2.18 on 2026-10-19 09:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobsy', '0004_jobdailysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Calendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=128, unique=True)),
+                ('description', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CalendarExclusion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField(blank=True, help_text='Start of the excluded window (blank for start of day)', null=True)),
+                ('end_time', models.TimeField(blank=True, help_text='End of the excluded window (blank for end of day)', null=True)),
+                ('description', models.CharField(blank=True, max_length=256)),
+                ('calendar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exclusions', to='jobsy.calendar')),
+            ],
+            options={
+                'ordering': ['date', 'start_time'],
+            },
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='calendar',
+            field=models.ForeignKey(blank=True, help_text='Calendar of dates and times on which this job is not expected to run', null=True, on_delete=django.db.models.deletion.SET_NULL, to='jobsy.calendar'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 3.2.18 on 2026-10-19 09:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobsy', '0005_calendar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobdailysummary',
+            name='check_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='jobdailysummary',
+            name='check_fail_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='jobdailysummary',
+            name='notify_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='JobCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checked', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('result', models.CharField(max_length=64)),
+                ('scheduled', models.DateTimeField(blank=True, null=True)),
+                ('notified', models.BooleanField(default=False)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='jobsy.job')),
+            ],
+            options={
+                'ordering': ['-checked'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='jobcheck',
+            index=models.Index(fields=['job', '-checked', '-id'], name='jobsy_jobcheck_job_checked'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcheck',
+            index=models.Index(fields=['checked'], name='jobsy_jobcheck_checked'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Adds an UPPER(email) expression index on the user model, matching the case-insensitive
+# (iexact) owner email lookups made by the Job admin search and bulk job provisioning.
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+
+INDEX_NAME = 'jobsy_user_email_upper'
+
+
+def email_index():
+    return models.Index(Upper('email'), name=INDEX_NAME)
+
+
+def add_index(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    schema_editor.add_index(User, email_index())
+
+
+def remove_index(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    schema_editor.remove_index(User, email_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('jobsy', '0006_jobcheck'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_index, remove_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.18 on 2026-10-19 09:34
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobsy', '0007_user_email_upper_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('flushed', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Creates the database cache table (if a database cache backend is configured), so that the
+# shared cache used by the job summary view is available wherever migrations have been run.
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    call_command('createcachetable', database=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobsy', '0008_ingestsegment'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
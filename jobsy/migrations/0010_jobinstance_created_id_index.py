@@ -0,0 +1,17 @@
+# Generated by Django 3.2.18 on 2026-10-19 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobsy', '0009_create_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobinstance',
+            index=models.Index(fields=['-created', '-id'], name='jobsy_jobinst_created_id'),
+        ),
+    ]
@@ -1,15 +1,77 @@
 from croniter import croniter
 from cron_descriptor import get_description
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
+from functools import lru_cache
 from django.conf import settings
 from django.core import mail
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.signals import post_delete, post_save
 from django.urls import reverse
 from django.utils import timezone
+from jobsy.calendars import clear_calendar_cache, get_compiled_calendar
 import logging
 import uuid
 
 
+# Cache key for the fleet health summary, invalidated after each workflow check run.
+SUMMARY_CACHE_KEY = "jobsy_fleet_summary"
+# The maximum number of consecutive calendar exclusions (days or windows) which may be skipped
+# when finding a job's previous or next scheduled instance.
+MAX_EXCLUSION_SKIPS = 1000
+
+
+@lru_cache(maxsize=1024)
+def describe_schedule(schedule):
+    """Returns a cron expression as a human-readable string. Results are cached, as many jobs
+    share identical schedules and generating a description is relatively slow.
+    """
+    return get_description(schedule)
+
+
+class Calendar(models.Model):
+    """A named set of dates and time windows (e.g. public holidays, maintenance periods) during
+    which scheduled jobs are not expected to run.
+    """
+    name = models.CharField(max_length=128, unique=True)
+    description = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+    def is_excluded(self, dt):
+        """Returns True if the passed-in datetime is excluded by this calendar.
+        """
+        return get_compiled_calendar(self.pk).is_excluded(dt)
+
+
+class CalendarExclusion(models.Model):
+    """A date excluded by a Calendar. If neither start_time nor end_time is set, the whole day is
+    excluded, otherwise only the window between them (local time).
+    """
+    calendar = models.ForeignKey(Calendar, on_delete=models.CASCADE, related_name="exclusions")
+    date = models.DateField()
+    start_time = models.TimeField(null=True, blank=True, help_text="Start of the excluded window (blank for start of day)")
+    end_time = models.TimeField(null=True, blank=True, help_text="End of the excluded window (blank for end of day)")
+    description = models.CharField(max_length=256, blank=True)
+
+    class Meta:
+        ordering = ["date", "start_time"]
+
+    def __str__(self):
+        if self.start_time or self.end_time:
+            return f"{self.calendar}|{self.date.isoformat()} {self.start_time or ''}-{self.end_time or ''}"
+        return f"{self.calendar}|{self.date.isoformat()}"
+
+    def clean(self):
+        if self.start_time and self.end_time and self.end_time <= self.start_time:
+            raise ValidationError({"end_time": "End time must be later than the start time"})
+
+
 class Job(models.Model):
     """A Job represents something that needs to happen.
     """
@@ -26,6 +88,9 @@ class Job(models.Model):
     last_notify = models.DateTimeField(null=True, blank=True, editable=False)  # Timestamp that an email notification was sent to owner.
     workflow_check_result = models.CharField(max_length=64, null=True, blank=True, editable=False)  # Result of the last check.
     url = models.URLField(max_length=2048, null=True, blank=True, help_text='Job URL')
+    calendar = models.ForeignKey(
+        Calendar, on_delete=models.SET_NULL, null=True, blank=True,
+        help_text="Calendar of dates and times on which this job is not expected to run")
 
     class Meta:
         ordering = ["-created"]
@@ -37,14 +102,39 @@ class Job(models.Model):
         return reverse('job_detail', kwargs={'id': self.id})
 
     def get_next(self):
-        """Based on the current local time, get the timestamp of the next scheduled instance of this job.
+        """Based on the current local time, get the timestamp of the next scheduled instance of this job
+        (skipping any instances excluded by the job's calendar).
         """
-        return croniter(self.schedule, datetime.now(timezone.get_default_timezone())).get_next(datetime)
+        instance = croniter(self.schedule, datetime.now(timezone.get_default_timezone())).get_next(datetime)
+        return self._skip_excluded(instance, forward=True)
 
     def get_prev(self):
-        """Based on the current local time, get the timestamp of the previous scheduled instance of this job.
+        """Based on the current local time, get the timestamp of the previous scheduled instance of this job
+        (skipping any instances excluded by the job's calendar).
+        """
+        instance = croniter(self.schedule, datetime.now(timezone.get_default_timezone())).get_prev(datetime)
+        return self._skip_excluded(instance, forward=False)
+
+    def _skip_excluded(self, instance, forward):
+        """If the passed-in scheduled instance is excluded by the job's calendar, move the schedule
+        past the whole excluded day or window (rather than stepping one instance at a time) until
+        reaching an instance which isn't excluded. Raises ValueError if none is found within
+        MAX_EXCLUSION_SKIPS consecutive exclusions.
         """
-        return croniter(self.schedule, datetime.now(timezone.get_default_timezone())).get_prev(datetime)
+        if not self.calendar_id:
+            return instance
+        calendar = get_compiled_calendar(self.calendar_id)
+        for _ in range(MAX_EXCLUSION_SKIPS):
+            exclusion = calendar.get_exclusion(instance)
+            if not exclusion:
+                return instance
+            start, end = exclusion
+            if forward:
+                # Exclusions end before `end`, so an instance at `end` itself is valid.
+                instance = croniter(self.schedule, end - timedelta(seconds=1)).get_next(datetime)
+            else:
+                instance = croniter(self.schedule, start).get_prev(datetime)
+        raise ValueError(f"No scheduled instance of job {self.id} found outside of calendar exclusions")
 
     def get_expected_finish(self):
         """Returns a datetime for the expected finish of the previous instance (the previous start
@@ -56,7 +146,7 @@ class Job(models.Model):
     def get_schedule_desc(self):
         """Returns schedule cron expresssion as a human-readable string.
         """
-        return get_description(self.schedule)
+        return describe_schedule(self.schedule)
 
     def check_within_schedule_deadline(self):
         """Returns boolean result for whether the current time is within the scheduled running time
@@ -175,7 +265,154 @@ class JobInstance(models.Model):
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            # Supports per-job history queries and keyset pagination on (created, id).
+            models.Index(fields=["job", "-created", "-id"], name="jobsy_jobinst_job_created"),
+            # Supports the admin changelist ordering (-created, -pk) across all jobs.
+            models.Index(fields=["-created", "-id"], name="jobsy_jobinst_created_id"),
+        ]
 
     def __str__(self):
         tz = timezone.get_default_timezone()
         return f'{self.job.id}|{self.created.astimezone(tz).isoformat()}|{self.status}'
+
+
+class IngestSegment(models.Model):
+    """A ledger of write-behind ingest spool segments, written in the same transaction as the
+    segment's job instances. A segment file whose name is recorded here has been committed, so
+    it is safe to delete rather than replay.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    flushed = models.DateTimeField(default=timezone.now, editable=False)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class JobCheck(models.Model):
+    """An append-only record of the outcome of a single workflow check of a Job, used to analyse
+    trends (flapping, time to recovery, check duration) without re-deriving them from JobInstance.
+    """
+    job = models.ForeignKey(Job, on_delete=models.CASCADE)
+    checked = models.DateTimeField(default=timezone.now, editable=False)
+    result = models.CharField(max_length=64)
+    scheduled = models.DateTimeField(null=True, blank=True)  # The scheduled instance being checked.
+    notified = models.BooleanField(default=False)  # Whether a notification was sent to the owner.
+    duration_ms = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-checked"]
+        indexes = [
+            # Supports per-job history queries and keyset pagination on (checked, id).
+            models.Index(fields=["job", "-checked", "-id"], name="jobsy_jobcheck_job_checked"),
+            models.Index(fields=["checked"], name="jobsy_jobcheck_checked"),
+        ]
+
+    def __str__(self):
+        tz = timezone.get_default_timezone()
+        return f"{self.job.id}|{self.checked.astimezone(tz).isoformat()}|{self.result}"
+
+
+class JobDailySummary(models.Model):
+    """A precomputed daily aggregate of the instances recorded and checks run for a Job, used for
+    rollups without scanning JobInstance or JobCheck. A successful instance is one having a
+    status matching the expected status for the job.
+    """
+    job = models.ForeignKey(Job, on_delete=models.CASCADE)
+    date = models.DateField(db_index=True)
+    instance_count = models.PositiveIntegerField(default=0)
+    success_count = models.PositiveIntegerField(default=0)
+    check_count = models.PositiveIntegerField(default=0)
+    check_fail_count = models.PositiveIntegerField(default=0)
+    notify_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(fields=["job", "date"], name="jobsy_jobdailysummary_job_date"),
+        ]
+        verbose_name_plural = "job daily summaries"
+
+    def __str__(self):
+        return f"{self.job.id}|{self.date.isoformat()}|{self.success_count}/{self.instance_count}"
+
+    @classmethod
+    def rollup(cls, day=None):
+        """(Re)calculate the daily summaries for all jobs for the given date (default today,
+        local time) using one grouped query over that day's instances and one over its checks.
+        Check counts are only recalculated for days within CHECK_HISTORY_RETENTION_DAYS.
+        """
+        tz = timezone.get_default_timezone()
+        if not day:
+            day = datetime.now(tz).date()
+        start = timezone.make_aware(datetime.combine(day, time.min), tz)
+        end = start + timedelta(days=1)
+        summaries = {}
+        instance_counts = JobInstance.objects.filter(created__gte=start, created__lt=end).order_by().values("job").annotate(
+            instance_count=Count("id"),
+            success_count=Count("id", filter=Q(status=F("job__status"))),
+        )
+        for c in instance_counts:
+            summaries[c["job"]] = cls(job_id=c["job"], date=day, instance_count=c["instance_count"], success_count=c["success_count"])
+        if start >= timezone.now() - timedelta(days=settings.CHECK_HISTORY_RETENTION_DAYS):
+            check_counts = JobCheck.objects.filter(checked__gte=start, checked__lt=end).order_by().values("job").annotate(
+                check_count=Count("id"),
+                check_fail_count=Count("id", filter=Q(result="Fail")),
+                notify_count=Count("id", filter=Q(notified=True)),
+            )
+        else:
+            # The check history for this day has been (at least partly) pruned, so retain the
+            # existing check counts rather than recalculating them.
+            check_counts = cls.objects.filter(date=day).values("job", "check_count", "check_fail_count", "notify_count")
+        for c in check_counts:
+            summary = summaries.setdefault(c["job"], cls(job_id=c["job"], date=day))
+            summary.check_count = c["check_count"]
+            summary.check_fail_count = c["check_fail_count"]
+            summary.notify_count = c["notify_count"]
+        summaries = list(summaries.values())
+        with transaction.atomic():
+            cls.objects.filter(date=day).delete()
+            cls.objects.bulk_create(summaries)
+        return summaries
+
+    @classmethod
+    def get_success_rates(cls, windows=None):
+        """Returns a dict of instance and success counts (and success rate), plus check, failed
+        check and notification counts, across all jobs for each window, where windows is a dict
+        of {label: number of days}. A window of N days covers the most-recent N calendar days
+        (local time), including today, so "1d" is today since midnight rather than a rolling 24
+        hours.
+        """
+        if windows is None:
+            windows = {"1d": 1, "7d": 7, "30d": 30}
+        today = datetime.now(timezone.get_default_timezone()).date()
+        aggregates = {}
+        for label, days in windows.items():
+            since = today - timedelta(days=days - 1)
+            aggregates[f"{label}_instances"] = Sum("instance_count", filter=Q(date__gte=since))
+            aggregates[f"{label}_success"] = Sum("success_count", filter=Q(date__gte=since))
+            aggregates[f"{label}_checks"] = Sum("check_count", filter=Q(date__gte=since))
+            aggregates[f"{label}_failed_checks"] = Sum("check_fail_count", filter=Q(date__gte=since))
+            aggregates[f"{label}_notifications"] = Sum("notify_count", filter=Q(date__gte=since))
+        since = today - timedelta(days=max(windows.values()) - 1)
+        totals = cls.objects.filter(date__gte=since).aggregate(**aggregates)
+        rates = {}
+        for label in windows:
+            instances = totals[f"{label}_instances"] or 0
+            success = totals[f"{label}_success"] or 0
+            rates[label] = {
+                "instances": instances,
+                "success": success,
+                "rate": round(success / instances, 4) if instances else None,
+                "checks": totals[f"{label}_checks"] or 0,
+                "failed_checks": totals[f"{label}_failed_checks"] or 0,
+                "notifications": totals[f"{label}_notifications"] or 0,
+            }
+        return rates
+
+
+# Discard compiled calendars whenever calendar data is changed.
+for sender in (Calendar, CalendarExclusion):
+    post_save.connect(clear_calendar_cache, sender=sender)
+    post_delete.connect(clear_calendar_cache, sender=sender)
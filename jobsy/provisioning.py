@@ -0,0 +1,183 @@
+from croniter import croniter
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Upper
+from jobsy.models import Calendar, Job
+import uuid
+
+
+# Manifest fields which may be set on a job, besides the owner and calendar.
+JOB_FIELDS = ("name", "schedule", "deadline", "status", "active", "url")
+REQUIRED_FIELDS = ("name", "schedule", "status", "owner")
+
+
+def clean_entry(entry):
+    """Validate and normalise the values of a single manifest entry, excluding the schedule and
+    owner (which are validated in bulk). Returns a tuple of (values, errors).
+    """
+    values = {}
+    errors = []
+    if not isinstance(entry, dict):
+        return values, ["entry must be an object"]
+    unknown = set(entry) - set(JOB_FIELDS) - {"id", "owner", "calendar"}
+    if unknown:
+        errors.append(f"unknown field(s): {', '.join(sorted(unknown))}")
+    for field in REQUIRED_FIELDS:
+        if not isinstance(entry.get(field), str) or not entry[field].strip():
+            errors.append(f"{field}: this field is required")
+    if errors:
+        return values, errors
+
+    values["name"] = entry["name"].strip()
+    values["schedule"] = entry["schedule"].strip()
+    values["status"] = entry["status"].strip()
+    values["owner"] = entry["owner"].strip()
+    values["owner_key"] = values["owner"].upper()  # Owner emails are matched case-insensitively.
+    for field in ("name", "schedule", "status"):
+        max_length = Job._meta.get_field(field).max_length
+        if len(values[field]) > max_length:
+            errors.append(f"{field}: value exceeds {max_length} characters")
+    if "id" in entry:
+        try:
+            values["id"] = uuid.UUID(str(entry["id"]))
+        except ValueError:
+            errors.append("id: value is not a valid UUID")
+    deadline = entry.get("deadline", Job._meta.get_field("deadline").default)
+    if not isinstance(deadline, int) or isinstance(deadline, bool) or deadline < 0:
+        errors.append("deadline: value must be zero or a positive integer")
+    values["deadline"] = deadline
+    active = entry.get("active", True)
+    if not isinstance(active, bool):
+        errors.append("active: value must be a boolean")
+    values["active"] = active
+    url = entry.get("url") or None
+    if url:
+        try:
+            URLValidator()(url)
+        except ValidationError:
+            errors.append("url: value is not a valid URL")
+    values["url"] = url
+    calendar = entry.get("calendar") or None
+    if calendar is not None and not isinstance(calendar, str):
+        errors.append("calendar: value must be a calendar name")
+    values["calendar"] = calendar
+    return values, errors
+
+
+def sync_jobs(entries, dry_run=False):
+    """Create or update jobs from a list of manifest entries (dicts). Each entry is matched to an
+    existing job by id (if supplied), otherwise by owner and name.
+
+    Schedules are validated once per unique expression, and owners (by email) and calendars (by
+    name) are each resolved in a single query. Changes are written using bulk_create/bulk_update
+    in one transaction, unless dry_run is True. Raises ValidationError listing every invalid
+    entry; otherwise returns a dict describing the jobs created, updated and unchanged.
+    """
+    if not isinstance(entries, list):
+        raise ValidationError("Manifest must contain a list of jobs")
+    cleaned = []
+    errors = []
+    for i, entry in enumerate(entries):
+        values, entry_errors = clean_entry(entry)
+        errors += [f"jobs[{i}]: {e}" for e in entry_errors]
+        # Invalid entries are excluded from the bulk checks below.
+        cleaned.append(None if entry_errors else values)
+    valid = [v for v in cleaned if v]
+
+    # Validate each distinct schedule expression once.
+    invalid_schedules = {s for s in {v["schedule"] for v in valid} if not croniter.is_valid(s)}
+    # Resolve all owners by email (case-insensitive, using the UPPER(email) index) in a single query.
+    emails = {v["owner_key"] for v in valid}
+    owners = {}
+    for user in get_user_model().objects.annotate(email_upper=Upper("email")).filter(email_upper__in=emails):
+        owners.setdefault(user.email_upper, []).append(user)
+    calendar_names = {v["calendar"] for v in valid if v["calendar"]}
+    calendars = dict(Calendar.objects.filter(name__in=calendar_names).values_list("name", "pk")) if calendar_names else {}
+    keys = set()
+    for i, values in enumerate(cleaned):
+        if not values:
+            continue
+        if values["schedule"] in invalid_schedules:
+            errors.append(f"jobs[{i}]: schedule: value is not a valid cron schedule")
+        if values["owner_key"] not in owners:
+            errors.append(f"jobs[{i}]: owner: no user with email {values['owner']}")
+        elif len(owners[values["owner_key"]]) > 1:
+            errors.append(f"jobs[{i}]: owner: multiple users with email {values['owner']}")
+        if values["calendar"] and values["calendar"] not in calendars:
+            errors.append(f"jobs[{i}]: calendar: no calendar named {values['calendar']}")
+        key = values.get("id") or (values["owner_key"], values["name"])
+        if key in keys:
+            errors.append(f"jobs[{i}]: duplicate job in manifest")
+        keys.add(key)
+    if errors:
+        raise ValidationError(errors)
+
+    # Fetch all potentially-matching existing jobs in a single query.
+    ids = [v["id"] for v in cleaned if "id" in v]
+    owner_ids = {owners[v["owner_key"]][0].pk for v in cleaned}
+    names = {v["name"] for v in cleaned if "id" not in v}
+    existing = Job.objects.filter(Q(id__in=ids) | Q(owner_id__in=owner_ids, name__in=names)).select_related("owner")
+    by_id = {}
+    by_name = {}
+    for job in existing:
+        by_id[job.id] = job
+        by_name.setdefault((job.owner.email.upper(), job.name), []).append(job)
+
+    create = []
+    update = []
+    result = {"created": [], "updated": [], "unchanged": 0}
+    claimed = {}  # Existing job pk: manifest index.
+    for i, values in enumerate(cleaned):
+        owner = owners[values["owner_key"]][0]
+        calendar_id = calendars.get(values["calendar"])
+        if "id" in values:
+            job = by_id.get(values["id"])
+        else:
+            matches = by_name.get((values["owner_key"], values["name"]), [])
+            if len(matches) > 1:
+                errors.append(f"jobs[{i}]: multiple existing jobs match this owner and name; supply an id")
+                continue
+            job = matches[0] if matches else None
+
+        if not job:
+            job = Job(owner=owner, calendar_id=calendar_id, **{field: values[field] for field in JOB_FIELDS})
+            if "id" in values:
+                job.id = values["id"]
+            create.append(job)
+            result["created"].append({"id": str(job.id), "name": job.name, "owner": owner.email})
+            continue
+
+        # Entries matched by id and by owner and name may resolve to the same existing job.
+        if job.pk in claimed:
+            errors.append(f"jobs[{i}]: matches the same existing job as jobs[{claimed[job.pk]}]")
+            continue
+        claimed[job.pk] = i
+
+        changes = {}
+        if job.owner_id != owner.pk:
+            changes["owner"] = [job.owner.email, owner.email]
+            job.owner = owner
+        if job.calendar_id != calendar_id:
+            names_by_id = {pk: name for name, pk in calendars.items()}
+            changes["calendar"] = [names_by_id.get(job.calendar_id, job.calendar_id), values["calendar"]]
+            job.calendar_id = calendar_id
+        for field in JOB_FIELDS:
+            if getattr(job, field) != values[field]:
+                changes[field] = [getattr(job, field), values[field]]
+                setattr(job, field, values[field])
+        if changes:
+            update.append(job)
+            result["updated"].append({"id": str(job.id), "name": job.name, "changes": changes})
+        else:
+            result["unchanged"] += 1
+    if errors:
+        raise ValidationError(errors)
+
+    if not dry_run:
+        with transaction.atomic():
+            Job.objects.bulk_create(create, batch_size=1000)
+            Job.objects.bulk_update(update, ("owner", "calendar") + JOB_FIELDS, batch_size=1000)
+    return result
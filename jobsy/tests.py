@@ -1,11 +1,27 @@
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from django.conf import settings
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Permission, User
 from django.core import mail
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
-from .models import Job, JobInstance
+from io import StringIO
+from pathlib import Path
+from smtplib import SMTPException
+from unittest import mock
+import json
+import os
+import tempfile
+from .admin import EstimatedCountPaginator
+from .calendars import clear_calendar_cache
+from .ingest import flush_spool, rotate_spool, spool_instance
+from .models import Calendar, CalendarExclusion, IngestSegment, Job, JobCheck, JobInstance, JobDailySummary, MAX_EXCLUSION_SKIPS
+from .provisioning import sync_jobs
 
 
 class JobTestCase(TestCase):
@@ -211,3 +227,586 @@ class JobTestCase(TestCase):
         response = self.client.post(url, {'foo': 'bar'})
         self.assertEqual(response.status_code, 400)
         self.assertFalse(JobInstance.objects.exists())
+
+
+class JobInstanceListTestCase(TestCase):
+    """Unit tests for the job instance history view.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='testuser@test.email', password='pass')
+        self.job = Job.objects.create(
+            name='Test job',
+            schedule='0 * * * *',
+            deadline=1,
+            status='ok',
+            owner=self.user,
+        )
+        self.now = datetime.now(timezone.get_default_timezone())
+        for i in range(10):
+            JobInstance.objects.create(
+                created=self.now - timedelta(hours=i),
+                job=self.job,
+                status='ok' if i % 2 == 0 else 'error',
+            )
+        self.url = reverse('job_instance_list', kwargs={'id': self.job.id})
+
+    def test_instance_list(self):
+        """Test that the instance list returns instances newest first
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['instances']), 10)
+        self.assertIsNone(data['next'])
+        self.assertNotIn('count', data)
+        created = [i[1] for i in data['instances']]
+        self.assertEqual(created, sorted(created, reverse=True))
+
+    def test_instance_list_pagination(self):
+        """Test that following the next cursor returns every instance exactly once
+        """
+        # Add a second instance having an identical created value, to test keyset tie-breaking.
+        JobInstance.objects.create(created=self.now - timedelta(hours=3), job=self.job, status='ok')
+        ids = []
+        params = {'limit': 3}
+        while True:
+            data = self.client.get(self.url, params).json()
+            self.assertTrue(len(data['instances']) <= 3)
+            ids += [i[0] for i in data['instances']]
+            if not data['next']:
+                break
+            params['cursor'] = data['next']
+        self.assertEqual(len(ids), 11)
+        self.assertEqual(set(ids), set(JobInstance.objects.values_list('id', flat=True)))
+
+    def test_instance_list_cursor_range(self):
+        """Test that the cursor query includes a range condition usable by the index scan
+        """
+        data = self.client.get(self.url, {'limit': 3}).json()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'limit': 3, 'cursor': data['next']})
+        self.assertIn('"created" <=', queries[-1]['sql'])
+
+    def test_instance_list_filters(self):
+        """Test the since, until, status and count query parameters
+        """
+        params = {
+            'since': (self.now - timedelta(hours=5, minutes=30)).isoformat(),
+            'until': (self.now - timedelta(minutes=30)).isoformat(),
+            'status': 'ok',
+            'count': 'true',
+        }
+        data = self.client.get(self.url, params).json()
+        self.assertEqual(data['count'], 2)  # Two and four hours ago.
+        self.assertEqual(len(data['instances']), 2)
+
+    def test_instance_list_invalid(self):
+        """Test that invalid query parameters return a bad request response
+        """
+        for params in [{'since': 'foo'}, {'limit': 0}, {'limit': 'foo'}, {'cursor': 'foo'}]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_instance_list_unknown_job(self):
+        """Test that an unknown job returns a not found response
+        """
+        url = reverse('job_instance_list', kwargs={'id': '00000000-0000-0000-0000-000000000000'})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+
+class JobSummaryTestCase(TestCase):
+    """Unit tests for the job summary view and daily job summaries.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', email='testuser@test.email', password='pass')
+        self.user2 = User.objects.create_user(username='testuser2', email='testuser2@test.email', password='pass')
+        self.job = Job.objects.create(name='Test job', schedule='0 * * * *', status='ok', owner=self.user, workflow_check_result='Fail')
+        Job.objects.create(name='Test job 2', schedule='0 * * * *', status='ok', owner=self.user, workflow_check_result='Success')
+        Job.objects.create(name='Test job 3', schedule='0 * * * *', status='ok', owner=self.user2, active=False)
+        now = datetime.now(timezone.get_default_timezone())
+        for status in ['ok', 'ok', 'error']:
+            JobInstance.objects.create(job=self.job, status=status, created=now)
+
+    def test_rollup(self):
+        """Test JobDailySummary.rollup and JobDailySummary.get_success_rates
+        """
+        JobDailySummary.rollup()
+        JobDailySummary.rollup()  # Recalculating a day replaces the existing summaries.
+        summary = JobDailySummary.objects.get()
+        self.assertEqual(summary.instance_count, 3)
+        self.assertEqual(summary.success_count, 2)
+        rates = JobDailySummary.get_success_rates()
+        self.assertEqual(rates['1d']['instances'], 3)
+        self.assertEqual(rates['30d']['success'], 2)
+
+    def test_job_summary_anonymous(self):
+        """Test that an anonymous user is redirected to the admin login
+        """
+        response = self.client.get(reverse('job_summary'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_job_summary(self):
+        """Test the job summary view counts and caching
+        """
+        self.client.login(username='testuser', password='pass')
+        url = reverse('job_summary')
+        data = self.client.get(url).json()
+        self.assertEqual(data['total'], 3)
+        self.assertEqual(data['active'], {'active': 2, 'inactive': 1})
+        self.assertEqual(data['workflow_check_result'], {'Fail': 1, 'Success': 1})
+        self.assertEqual(data['owners']['testuser@test.email']['workflow_check_result']['Fail'], 1)
+        self.assertEqual(data['owners']['testuser2@test.email']['inactive'], 1)
+        self.assertIsNone(data['success_rate']['7d']['rate'])
+        # The response is cached until the next workflow check run.
+        self.job.delete()
+        self.assertEqual(self.client.get(url).json()['total'], 3)
+        call_command('check_job_workflows')
+        data = self.client.get(url).json()
+        self.assertEqual(data['total'], 2)
+
+
+class AdminTestCase(TestCase):
+    """Unit tests for the jobsy admin changelists.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', email='admin@test.email', password='pass')
+        for i in range(5):
+            job = Job.objects.create(name=f'Test job {i}', schedule='0 * * * *', status='ok', owner=self.user)
+            JobInstance.objects.create(job=job, status='ok')
+        self.client.login(username='admin', password='pass')
+        # On PostgreSQL, the paginator queries the planner's row estimate before counting.
+        self.estimate_queries = 1 if connection.vendor == 'postgresql' else 0
+
+    def test_estimated_count_paginator(self):
+        """Test that EstimatedCountPaginator uses the row estimate only for large, unfiltered querysets
+        """
+        qs = Job.objects.all()
+        with mock.patch.object(EstimatedCountPaginator, 'get_estimate', return_value=50000):
+            self.assertEqual(EstimatedCountPaginator(qs, 100).count, 50000)
+            self.assertEqual(EstimatedCountPaginator(qs.filter(active=True), 100).count, 5)
+        with mock.patch.object(EstimatedCountPaginator, 'get_estimate', return_value=50):
+            self.assertEqual(EstimatedCountPaginator(qs, 100).count, 5)
+
+    def test_job_changelist(self):
+        """Test that the job changelist renders in a constant number of queries
+        """
+        url = reverse('admin:jobsy_job_changelist')
+        # Session, user, calendar filter choices, paginator count and job list (with owners).
+        with self.assertNumQueries(5 + self.estimate_queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_job_changelist_search_owner(self):
+        """Test that the job changelist can be searched by owner email
+        """
+        User.objects.create_user(username='testuser', email='testuser@test.email')
+        url = reverse('admin:jobsy_job_changelist')
+        response = self.client.get(url, {'q': 'admin@test.email'})
+        self.assertEqual(response.context['cl'].result_count, 5)
+        response = self.client.get(url, {'q': 'testuser@test.email'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_jobinstance_changelist(self):
+        """Test that the job instance changelist renders and is read-only
+        """
+        url = reverse('admin:jobsy_jobinstance_changelist')
+        with self.assertNumQueries(4 + self.estimate_queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('admin:jobsy_jobinstance_add'))
+        self.assertEqual(response.status_code, 403)
+
+
+class JobProvisioningTestCase(TestCase):
+    """Unit tests for bulk job provisioning.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='testuser@test.email', password='pass')
+        self.job = Job.objects.create(name='Test job', schedule='0 * * * *', status='ok', owner=self.user)
+        self.manifest = [
+            {'name': 'Test job', 'schedule': '30 * * * *', 'status': 'ok', 'owner': 'testuser@test.email'},
+            {'name': 'New job', 'schedule': '0 0 * * *', 'status': 'ok', 'owner': 'testuser@test.email', 'deadline': 30},
+            {'id': str(self.job.id), 'name': 'Test job', 'schedule': '0 * * * *', 'status': 'ok', 'owner': 'testuser@test.email'},
+        ]
+
+    def test_sync_jobs(self):
+        """Test that sync_jobs creates and updates jobs in a constant number of queries
+        """
+        del self.manifest[2]
+        # Owners, existing jobs, then the transaction containing one insert and one update.
+        with self.assertNumQueries(6):
+            result = sync_jobs(self.manifest)
+        self.assertEqual(len(result['created']), 1)
+        self.assertEqual(result['updated'][0]['changes'], {'schedule': ['0 * * * *', '30 * * * *']})
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.schedule, '30 * * * *')
+        self.assertEqual(Job.objects.get(name='New job').deadline, 30)
+        result = sync_jobs(self.manifest)
+        self.assertEqual(result['unchanged'], 2)
+
+    def test_sync_jobs_same_existing_job(self):
+        """Test that sync_jobs rejects entries (matched by id and by name) resolving to the same job
+        """
+        with self.assertRaises(ValidationError) as cm:
+            sync_jobs(self.manifest)
+        self.assertEqual(cm.exception.messages, ['jobs[2]: matches the same existing job as jobs[0]'])
+        # Renaming the job by id, while creating a new job with its old name.
+        self.manifest = [dict(self.manifest[2], name='Renamed job'), self.manifest[0]]
+        with self.assertRaises(ValidationError):
+            sync_jobs(self.manifest)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.name, 'Test job')
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_sync_jobs_owner_case(self):
+        """Test that sync_jobs matches owner emails case-insensitively
+        """
+        for entry in self.manifest:
+            entry['owner'] = 'TestUser@Test.Email'
+        del self.manifest[2]
+        result = sync_jobs(self.manifest)
+        self.assertEqual(len(result['created']), 1)
+        self.assertEqual(len(result['updated']), 1)
+        self.assertEqual(Job.objects.get(name='New job').owner, self.user)
+
+    def test_sync_jobs_dry_run(self):
+        """Test that a dry run of sync_jobs does not save changes
+        """
+        del self.manifest[2]
+        result = sync_jobs(self.manifest, dry_run=True)
+        self.assertEqual(len(result['created']), 1)
+        self.assertEqual(Job.objects.count(), 1)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.schedule, '0 * * * *')
+
+    def test_sync_jobs_invalid(self):
+        """Test that sync_jobs reports every invalid entry and saves nothing
+        """
+        self.manifest.append({'name': 'Bad job', 'schedule': 'foo', 'status': 'ok', 'owner': 'nobody@test.email'})
+        self.manifest.append({'name': 'Bad job 2', 'owner': 'testuser@test.email'})
+        with self.assertRaises(ValidationError) as cm:
+            sync_jobs(self.manifest)
+        messages = cm.exception.messages
+        self.assertIn('jobs[3]: schedule: value is not a valid cron schedule', messages)
+        self.assertIn('jobs[3]: owner: no user with email nobody@test.email', messages)
+        self.assertIn('jobs[4]: schedule: this field is required', messages)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_sync_jobs_duplicate(self):
+        """Test that sync_jobs rejects a manifest containing the same job twice
+        """
+        self.manifest.append(self.manifest[0])
+        with self.assertRaises(ValidationError):
+            sync_jobs(self.manifest)
+
+    def test_job_bulk_sync_view(self):
+        """Test the bulk job sync view requires permission and applies the manifest
+        """
+        url = reverse('job_bulk_sync')
+        del self.manifest[2]
+        body = json.dumps({'jobs': self.manifest})
+        self.client.login(username='testuser', password='pass')
+        response = self.client.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.user.user_permissions.add(*Permission.objects.filter(codename__in=['add_job', 'change_job']))
+        response = self.client.post(f'{url}?dry_run=true', body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['dry_run'])
+        self.assertEqual(Job.objects.count(), 1)
+        response = self.client.post(url, body, content_type='application/json')
+        self.assertEqual(len(response.json()['created']), 1)
+        self.assertEqual(Job.objects.count(), 2)
+        response = self.client.post(url, 'foo', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, body, content_type='text/plain')
+        self.assertEqual(response.status_code, 415)
+
+    def test_job_bulk_sync_view_csrf(self):
+        """Test the bulk job sync view requires a CSRF token
+        """
+        self.user.user_permissions.add(*Permission.objects.filter(codename__in=['add_job', 'change_job']))
+        client = Client(enforce_csrf_checks=True)
+        client.login(username='testuser', password='pass')
+        url = reverse('job_bulk_sync')
+        body = json.dumps(self.manifest[:2])
+        response = client.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Job.objects.count(), 1)
+        client.get(reverse('admin:login'))  # Sets the CSRF cookie.
+        token = client.cookies['csrftoken'].value
+        response = client.post(url, body, content_type='application/json', HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_sync_jobs_command(self):
+        """Test the sync_jobs management command with a JSON manifest
+        """
+        del self.manifest[2]
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as f:
+            json.dump({'jobs': self.manifest}, f)
+            f.flush()
+            out = StringIO()
+            call_command('sync_jobs', f.name, '--dry-run', stdout=out)
+            self.assertIn('1 created, 1 updated, 0 unchanged', out.getvalue())
+            self.assertEqual(Job.objects.count(), 1)
+            call_command('sync_jobs', f.name, stdout=out)
+            self.assertEqual(Job.objects.count(), 2)
+
+
+class CalendarTestCase(TestCase):
+    """Unit tests for job calendars.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='testuser@test.email', password='pass')
+        self.calendar = Calendar.objects.create(name='Public holidays')
+        self.job = Job.objects.create(
+            name='Test job',
+            schedule='0 * * * *',
+            deadline=1,
+            status='ok',
+            owner=self.user,
+            calendar=self.calendar,
+        )
+        self.now = datetime.now(timezone.get_default_timezone())
+
+    def test_is_excluded_day(self):
+        """Test Calendar.is_excluded for a whole-day exclusion
+        """
+        CalendarExclusion.objects.create(calendar=self.calendar, date=self.now.date())
+        self.assertTrue(self.calendar.is_excluded(self.now))
+        self.assertFalse(self.calendar.is_excluded(self.now + timedelta(days=1)))
+        self.assertFalse(self.calendar.is_excluded(self.now - timedelta(days=366)))
+
+    def test_is_excluded_window(self):
+        """Test Calendar.is_excluded for an excluded time window
+        """
+        day = self.now.date()
+        CalendarExclusion.objects.create(calendar=self.calendar, date=day, start_time=time(9), end_time=time(17))
+        tz = timezone.get_default_timezone()
+        self.assertTrue(self.calendar.is_excluded(timezone.make_aware(datetime.combine(day, time(9)), tz)))
+        self.assertFalse(self.calendar.is_excluded(timezone.make_aware(datetime.combine(day, time(17)), tz)))
+        self.assertFalse(self.calendar.is_excluded(timezone.make_aware(datetime.combine(day, time(8, 59)), tz)))
+
+    def test_get_prev_excluded(self):
+        """Test that Job.get_prev skips excluded instances without querying the database
+        """
+        prev = self.job.get_prev()
+        CalendarExclusion.objects.create(calendar=self.calendar, date=prev.date(), start_time=prev.time())
+        self.calendar.is_excluded(prev)  # Compile the calendar.
+        with self.assertNumQueries(0):
+            excluded_prev = self.job.get_prev()
+        self.assertTrue(excluded_prev < prev)
+        self.assertFalse(self.calendar.is_excluded(excluded_prev))
+
+    def test_get_prev_next_long_exclusion(self):
+        """Test that Job.get_prev and Job.get_next skip a week-long exclusion of a per-minute job
+        """
+        self.job.schedule = '* * * * *'
+        self.job.save()
+        today = self.now.date()
+        for i in range(-3, 4):
+            CalendarExclusion.objects.create(calendar=self.calendar, date=today + timedelta(days=i))
+        tz = timezone.get_default_timezone()
+        window_start = timezone.make_aware(datetime.combine(today - timedelta(days=3), time.min), tz)
+        window_end = timezone.make_aware(datetime.combine(today + timedelta(days=4), time.min), tz)
+        self.assertEqual(self.job.get_prev(), window_start - timedelta(minutes=1))
+        self.assertEqual(self.job.get_next(), window_end)
+
+    def test_get_prev_all_excluded(self):
+        """Test that Job.get_prev raises an exception when the calendar excludes every instance
+        """
+        self.job.schedule = '0 0 * * *'
+        self.job.save()
+        today = self.now.date()
+        CalendarExclusion.objects.bulk_create([
+            CalendarExclusion(calendar=self.calendar, date=today - timedelta(days=i)) for i in range(MAX_EXCLUSION_SKIPS + 1)
+        ])
+        clear_calendar_cache()  # bulk_create doesn't send post_save signals.
+        with self.assertRaises(ValueError):
+            self.job.get_prev()
+
+    def test_job_views_all_excluded(self):
+        """Test that the job list and detail views handle a calendar excluding every instance
+        """
+        self.job.schedule = '0 0 * * *'
+        self.job.save()
+        today = self.now.date()
+        CalendarExclusion.objects.bulk_create([
+            CalendarExclusion(calendar=self.calendar, date=today - timedelta(days=i)) for i in range(MAX_EXCLUSION_SKIPS + 1)
+        ])
+        clear_calendar_cache()
+        self.client.login(username='testuser', password='pass')
+        response = self.client.get(reverse('job_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()[0]['expected_finish'])
+        response = self.client.get(reverse('job_detail', kwargs={'id': self.job.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['expected_finish'])
+
+    def test_notify_workflow_excluded(self):
+        """Test that Job.notify_workflow does not fail a job for an excluded instance
+        """
+        prev = self.job.get_prev()
+        # The job last ran for the instance before the previous one.
+        JobInstance.objects.create(job=self.job, status='ok', created=prev - timedelta(minutes=59))
+        self.assertFalse(self.job.notify_workflow(log=False))
+        CalendarExclusion.objects.create(calendar=self.calendar, date=prev.date(), start_time=prev.time())
+        self.assertTrue(self.job.notify_workflow(log=False))
+        self.assertEqual(self.job.workflow_check_result, 'Success')
+
+
+class IngestSpoolTestCase(TestCase):
+    """Unit tests for write-behind ingestion of job instances.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='testuser@test.email', password='pass')
+        self.job = Job.objects.create(name='Test job', schedule='0 * * * *', status='ok', owner=self.user)
+        self.url = reverse('job_detail', kwargs={'id': self.job.id})
+        self.spool_dir = tempfile.TemporaryDirectory()
+        self.spool_settings = self.settings(INGEST_SPOOL_DIR=self.spool_dir.name)
+        self.spool_settings.enable()
+
+    def tearDown(self):
+        self.spool_settings.disable()
+        self.spool_dir.cleanup()
+
+    def test_spool_and_flush(self):
+        """Test that POSTed instances are spooled, then inserted by a flush
+        """
+        for status in ['ok', 'error']:
+            response = self.client.post(self.url, {'status': status})
+            self.assertEqual(response.status_code, 200)
+        self.assertFalse(JobInstance.objects.exists())
+        self.assertEqual(flush_spool(), 2)
+        self.assertEqual(JobInstance.objects.filter(job=self.job).count(), 2)
+        self.assertEqual(JobInstance.objects.first().status, 'error')
+        # Flushed segments are removed.
+        self.assertEqual(flush_spool(), 0)
+        self.assertEqual(os.listdir(self.spool_dir.name), ['flush.lock'])
+
+    def test_flush_replay(self):
+        """Test that a segment left by an interrupted flush is replayed once, skipping malformed records
+        """
+        deleted_job = Job.objects.create(name='Deleted job', schedule='0 * * * *', status='ok', owner=self.user)
+        spool_instance(deleted_job.id, 'ok')  # The first record is discarded by the flush.
+        deleted_job.delete()
+        spool_instance(self.job.id, 'ok')
+        spool_instance(self.job.id, 'ok')
+        rotate_spool(Path(self.spool_dir.name))  # Simulate a crash after rotation.
+        segment = next(Path(self.spool_dir.name).glob('*.flushing'))
+        with open(segment, 'a') as f:
+            f.write('{"job": "partial')
+        # Simulate a crash after the segment was committed, but before it was deleted.
+        with mock.patch.object(Path, 'unlink', side_effect=OSError):
+            with self.assertRaises(OSError):
+                flush_spool()
+        self.assertTrue(segment.exists())
+        self.assertEqual(JobInstance.objects.count(), 2)
+        self.assertEqual(flush_spool(), 0)
+        self.assertFalse(segment.exists())
+        self.assertEqual(JobInstance.objects.count(), 2)
+        self.assertFalse(IngestSegment.objects.exists())
+
+    def test_check_job_workflows_spooled(self):
+        """Test that a spooled instance counts as good when running workflow checks
+        """
+        # A deadline of zero means that the job is never inside the schedule deadline.
+        self.job.deadline = 0
+        self.job.save()
+        response = self.client.post(self.url, {'status': 'ok'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(JobInstance.objects.exists())
+        call_command('check_job_workflows')
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.workflow_check_result, 'Success')
+
+    def test_spool_full(self):
+        """Test that instances are inserted directly when the spool is full
+        """
+        with self.settings(INGEST_SPOOL_MAX_BYTES=1):
+            spool_instance(self.job.id, 'ok')
+            self.assertFalse(spool_instance(self.job.id, 'ok'))
+            response = self.client.post(self.url, {'status': 'ok'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(JobInstance.objects.count(), 1)
+
+
+class JobCheckTestCase(TestCase):
+    """Unit tests for the job check history.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', email='testuser@test.email', password='pass')
+        # A yearly schedule with a zero deadline means that the previous scheduled instance can't
+        # change during the test, and the jobs are never inside the schedule deadline.
+        self.job = Job.objects.create(name='Test job', schedule='0 0 1 1 *', deadline=0, status='ok', owner=self.user)
+        self.job2 = Job.objects.create(name='Test job 2', schedule='0 0 1 1 *', deadline=0, status='ok', owner=self.user)
+        JobInstance.objects.create(job=self.job, status='ok')
+
+    def test_check_job_workflows_history(self):
+        """Test that a check run appends one check record per active job, and applies retention
+        """
+        old = JobCheck.objects.create(job=self.job, result='Success', checked=timezone.now() - timedelta(days=365))
+        call_command('check_job_workflows')
+        checks = JobCheck.objects.exclude(pk=old.pk)
+        self.assertFalse(JobCheck.objects.filter(pk=old.pk).exists())
+        self.assertEqual(checks.count(), 2)
+        check = checks.get(job=self.job)
+        self.assertEqual(check.result, 'Success')
+        self.assertEqual(checks.get(job=self.job2).result, 'Check result unknown')
+        self.assertEqual(check.scheduled, self.job.get_prev())
+        self.assertFalse(check.notified)
+        day = check.checked.astimezone(timezone.get_default_timezone()).date()
+        summary = JobDailySummary.objects.get(job=self.job, date=day)
+        self.assertEqual(summary.check_count, 1)
+        self.assertEqual(JobDailySummary.get_success_rates()['7d']['checks'], 2)
+
+    def test_check_job_workflows_error(self):
+        """Test that an error checking one job is recorded in the check history, and the run continues
+        """
+        # The job was good previously, but no instance has been recorded since the last scheduled time.
+        JobInstance.objects.update(created=self.job.get_prev() - timedelta(days=1))
+        self.job.last_good = self.job.get_prev() - timedelta(days=1)
+        self.job.save()
+        with self.settings(SEND_NOTIFICATIONS=True):
+            with mock.patch.object(Job, 'send_notification', side_effect=SMTPException):
+                call_command('check_job_workflows')
+        check = JobCheck.objects.get(job=self.job)
+        self.assertEqual(check.result, 'Error')
+        self.assertFalse(check.notified)
+        self.assertEqual(JobCheck.objects.get(job=self.job2).result, 'Check result unknown')
+
+    def test_rollup_beyond_retention(self):
+        """Test that recalculating a day beyond the check history retention keeps its check counts
+        """
+        day = datetime.now(timezone.get_default_timezone()).date() - timedelta(days=settings.CHECK_HISTORY_RETENTION_DAYS + 1)
+        JobDailySummary.objects.create(job=self.job, date=day, instance_count=1, check_count=24, check_fail_count=2, notify_count=1)
+        call_command('rollup_job_summaries', '--days', settings.CHECK_HISTORY_RETENTION_DAYS + 2)
+        summary = JobDailySummary.objects.get(job=self.job, date=day)
+        self.assertEqual(summary.instance_count, 0)  # No instances were recorded on that day.
+        self.assertEqual((summary.check_count, summary.check_fail_count, summary.notify_count), (24, 2, 1))
+
+    def test_job_check_list(self):
+        """Test the job check history view
+        """
+        now = timezone.now()
+        for i, result in enumerate(['Fail', 'Success', 'Fail']):
+            JobCheck.objects.create(job=self.job, result=result, checked=now - timedelta(hours=i), notified=result == 'Fail')
+        url = reverse('job_check_list', kwargs={'id': self.job.id})
+        data = self.client.get(url, {'limit': 2}).json()
+        self.assertEqual(data['fields'], ['id', 'checked', 'result', 'scheduled', 'notified', 'duration_ms'])
+        self.assertEqual([c[2] for c in data['checks']], ['Fail', 'Success'])
+        data = self.client.get(url, {'cursor': data['next']}).json()
+        self.assertEqual(len(data['checks']), 1)
+        self.assertIsNone(data['next'])
+        data = self.client.get(url, {'result': 'Fail', 'count': 'true'}).json()
+        self.assertEqual(data['count'], 2)
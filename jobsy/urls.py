@@ -1,7 +1,11 @@
 from django.urls import path
-from .views import JobListView, JobDetailView
+from .views import JobListView, JobBulkSyncView, JobSummaryView, JobDetailView, JobInstanceListView, JobCheckListView
 
 urlpatterns = [
     path('', JobListView.as_view(), name='job_list'),
+    path('bulk', JobBulkSyncView.as_view(), name='job_bulk_sync'),
+    path('summary', JobSummaryView.as_view(), name='job_summary'),
     path('<uuid:id>', JobDetailView.as_view(), name='job_detail'),
+    path('<uuid:id>/instances', JobInstanceListView.as_view(), name='job_instance_list'),
+    path('<uuid:id>/checks', JobCheckListView.as_view(), name='job_check_list'),
 ]
@@ -1,12 +1,32 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+import json
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.cache import never_cache
 
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Q
 from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.generic.base import View
-from .models import Job, JobInstance
+from .models import Job, JobCheck, JobInstance, JobDailySummary, SUMMARY_CACHE_KEY
+from .ingest import spool_enabled, spool_instance
+from .provisioning import sync_jobs
+
+
+def get_expected_finish(job):
+    """Returns the job's expected finish, or None if its calendar excludes every scheduled instance.
+    """
+    try:
+        return job.get_expected_finish()
+    except ValueError:
+        return None
 
 
 class JobListView(LoginRequiredMixin, View):
@@ -19,13 +39,81 @@ class JobListView(LoginRequiredMixin, View):
             'name': job.name,
             'schedule': job.schedule,
             'deadline': job.deadline,
-            'expected_finish': job.get_expected_finish(),
+            'expected_finish': get_expected_finish(job),
             'owner': job.owner.email,
             'active': job.active,
         } for job in qs]
         return JsonResponse(jobs, safe=False)
 
 
+class JobBulkSyncView(PermissionRequiredMixin, View):
+    """Create or update jobs in bulk from a JSON manifest, being either a list of job objects or
+    an object having a `jobs` list. Pass ?dry_run=true to return the changes without saving them.
+    Requests are authenticated by session, so must have a Content-Type of application/json and
+    include a CSRF token (X-CSRFToken header).
+    """
+    http_method_names = ['post', 'options']
+    permission_required = ('jobsy.add_job', 'jobsy.change_job')
+
+    def post(self, request, *args, **kwargs):
+        if request.content_type != 'application/json':
+            return JsonResponse({'errors': ['Content-Type must be application/json']}, status=415)
+        try:
+            manifest = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'errors': ['Request body is not valid JSON']}, status=400)
+        if isinstance(manifest, dict):
+            manifest = manifest.get('jobs')
+        dry_run = request.GET.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        try:
+            result = sync_jobs(manifest, dry_run=dry_run)
+        except ValidationError as e:
+            return JsonResponse({'errors': e.messages}, status=400)
+        result['dry_run'] = dry_run
+        return JsonResponse(result)
+
+
+class JobSummaryView(LoginRequiredMixin, View):
+    """Returns aggregated health counts for all jobs (by active state, workflow check result
+    and owner) plus success rate rollups from the daily job summaries, over windows of 1, 7 and
+    30 calendar days including today. The result is cached
+    for a short period, and invalidated after each workflow check run.
+    """
+    http_method_names = ['get', 'options']
+
+    def get(self, request, *args, **kwargs):
+        summary = cache.get(SUMMARY_CACHE_KEY)
+        if summary is None:
+            summary = self.get_summary()
+            cache.set(SUMMARY_CACHE_KEY, summary, settings.SUMMARY_CACHE_TIMEOUT)
+        return JsonResponse(summary)
+
+    def get_summary(self):
+        # A single grouped query supplies all of the job counts.
+        groups = Job.objects.order_by().values('owner__email', 'active', 'workflow_check_result').annotate(count=Count('id'))
+        summary = {
+            'total': 0,
+            'active': {'active': 0, 'inactive': 0},
+            'workflow_check_result': {},
+            'owners': {},
+        }
+        for group in groups:
+            count = group['count']
+            state = 'active' if group['active'] else 'inactive'
+            result = group['workflow_check_result'] or 'Unchecked'
+            summary['total'] += count
+            summary['active'][state] += count
+            owner = summary['owners'].setdefault(group['owner__email'], {'total': 0, 'active': 0, 'inactive': 0, 'workflow_check_result': {}})
+            owner['total'] += count
+            owner[state] += count
+            # Check results are only meaningful for active jobs.
+            if group['active']:
+                summary['workflow_check_result'][result] = summary['workflow_check_result'].get(result, 0) + count
+                owner['workflow_check_result'][result] = owner['workflow_check_result'].get(result, 0) + count
+        summary['success_rate'] = JobDailySummary.get_success_rates()
+        return summary
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 @method_decorator(never_cache, name='dispatch')
 class JobDetailView(View):
@@ -40,7 +128,7 @@ class JobDetailView(View):
             'name': job.name,
             'schedule': job.schedule,
             'deadline': job.deadline,
-            'expected_finish': job.get_expected_finish(),
+            'expected_finish': get_expected_finish(job),
             'owner': job.owner.email,
             'last_checked': job.last_checked.astimezone(tz).isoformat() if job.last_checked else None,
             'last_good': job.last_good.astimezone(tz).isoformat() if job.last_good else None,
@@ -60,9 +148,129 @@ class JobDetailView(View):
         if 'status' not in self.request.POST or not self.request.POST['status']:
             return HttpResponseBadRequest('ERROR')
         job = Job.objects.get(id=kwargs['id'])
+        # In write-behind mode, spool the instance for a later batched insert (unless the spool is full).
+        if spool_enabled() and spool_instance(job.id, request.POST['status']):
+            return HttpResponse('OK')
         JobInstance.objects.create(
             job=job,
             status=request.POST['status']
         )
 
         return HttpResponse('OK')
+
+
+def encode_cursor(created, pk):
+    """Returns an opaque pagination cursor for a (timestamp, id) keyset.
+    """
+    return urlsafe_b64encode(f"{created.isoformat()}|{pk}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns a (timestamp, id) tuple from a pagination cursor, or raises ValueError.
+    """
+    try:
+        created, pk = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        created = parse_datetime(created)
+        pk = int(pk)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if created is None:
+        raise ValueError("Invalid cursor")
+    return created, pk
+
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp query parameter, assuming the default timezone if naive.
+    Raises ValueError on an invalid value.
+    """
+    timestamp = parse_datetime(value)
+    if timestamp is None:
+        raise ValueError("Invalid timestamp")
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp, timezone.get_default_timezone())
+    return timestamp
+
+
+class JobHistoryView(View):
+    """Base view returning a job's history records (of `model`), newest first, using keyset
+    pagination on (timestamp_field, id) so that every page costs the same regardless of depth.
+    Query parameters (all optional):
+    - since / until: ISO 8601 timestamps bounding the timestamp field (inclusive / exclusive)
+    - <filter_field>: exact value to filter on
+    - limit: page size (default 100, maximum 1000)
+    - cursor: the `next` value returned by the previous page
+    - count: if true, include the total number of records matching the filters
+    """
+    http_method_names = ['get', 'options']
+    default_limit = 100
+    max_limit = 1000
+    model = None
+    timestamp_field = None
+    filter_field = None
+    fields = None
+    results_name = None
+
+    def get(self, request, *args, **kwargs):
+        job = get_object_or_404(Job, id=kwargs['id'])
+        qs = self.model.objects.filter(job=job)
+        ts = self.timestamp_field
+
+        try:
+            if request.GET.get('since'):
+                qs = qs.filter(**{f'{ts}__gte': parse_timestamp(request.GET['since'])})
+            if request.GET.get('until'):
+                qs = qs.filter(**{f'{ts}__lt': parse_timestamp(request.GET['until'])})
+            limit = int(request.GET.get('limit', self.default_limit))
+            if limit < 1:
+                raise ValueError("Invalid limit")
+            limit = min(limit, self.max_limit)
+            cursor = decode_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+        except ValueError as e:
+            return HttpResponseBadRequest(f'ERROR: {e}')
+
+        if request.GET.get(self.filter_field):
+            qs = qs.filter(**{self.filter_field: request.GET[self.filter_field]})
+
+        result = {'job': job.id}
+        if request.GET.get('count', '').lower() in ('1', 'true', 'yes'):
+            result['count'] = qs.count()
+
+        if cursor:
+            timestamp, pk = cursor
+            # The redundant <= condition lets the index scan start at the cursor position, rather
+            # than scanning (and discarding) every newer row.
+            qs = qs.filter(Q(**{f'{ts}__lt': timestamp}) | Q(**{ts: timestamp, 'id__lt': pk}), **{f'{ts}__lte': timestamp})
+        # Fetch one extra row to determine whether a further page exists.
+        rows = list(qs.order_by(f'-{ts}', '-id').values_list('id', ts, *self.fields)[:limit + 1])
+        more = len(rows) > limit
+        rows = rows[:limit]
+
+        tz = timezone.get_default_timezone()
+        result['fields'] = ['id', ts, *self.fields]
+        result[self.results_name] = [
+            [value.astimezone(tz).isoformat() if isinstance(value, datetime) else value for value in row] for row in rows
+        ]
+        result['next'] = encode_cursor(rows[-1][1], rows[-1][0]) if more else None
+        return JsonResponse(result)
+
+
+@method_decorator(never_cache, name='dispatch')
+class JobInstanceListView(JobHistoryView):
+    """Returns the instance history for a job (see JobHistoryView), optionally filtered by status.
+    """
+    model = JobInstance
+    timestamp_field = 'created'
+    filter_field = 'status'
+    fields = ('status',)
+    results_name = 'instances'
+
+
+@method_decorator(never_cache, name='dispatch')
+class JobCheckListView(JobHistoryView):
+    """Returns the workflow check history for a job (see JobHistoryView), optionally filtered by result.
+    """
+    model = JobCheck
+    timestamp_field = 'checked'
+    filter_field = 'result'
+    fields = ('result', 'scheduled', 'notified', 'duration_ms')
+    results_name = 'checks'
@@ -75,6 +75,25 @@ DATABASES = {
 }
 
 
+# Cache configuration
+# The cache must be shared between processes, so that invalidations made by the job workflow
+# checker are seen by the web workers. The default database cache table is created by migrations.
+CACHES = {
+    'default': {
+        'BACKEND': env('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': env('CACHE_LOCATION', 'jobsy_cache'),
+    }
+}
+SUMMARY_CACHE_TIMEOUT = env('SUMMARY_CACHE_TIMEOUT', 60)
+
+
+# Write-behind ingestion of job instances (disabled unless a spool directory is set).
+INGEST_SPOOL_DIR = env('INGEST_SPOOL_DIR', '')
+INGEST_SPOOL_MAX_BYTES = env('INGEST_SPOOL_MAX_BYTES', 64 * 1024 * 1024)
+INGEST_SPOOL_FSYNC = env('INGEST_SPOOL_FSYNC', True)
+INGEST_BATCH_SIZE = env('INGEST_BATCH_SIZE', 5000)
+
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'Australia/Perth'
@@ -88,6 +107,8 @@ EMAIL_HOST = env('EMAIL_HOST', 'email.host')
 EMAIL_PORT = env('EMAIL_PORT', 25)
 NOREPLY_EMAIL = env('NOREPLY_EMAIL', 'noreply@dbca.wa.gov.au')
 SEND_NOTIFICATIONS = env('SEND_NOTIFICATIONS', False)
+# Number of days for which job check history is retained.
+CHECK_HISTORY_RETENTION_DAYS = env('CHECK_HISTORY_RETENTION_DAYS', 90)
 
 
 # Static files configuration